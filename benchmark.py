@@ -0,0 +1,343 @@
+# python
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import contextlib
+
+import encoder_test_tools as ett
+
+
+fake_vspipe = r'''#!{python}
+import os
+import re
+import sys
+
+args = sys.argv[1:]
+frames = int(os.environ.get("BENCH_FRAMES", "1000"))
+width, height = 64, 36
+
+if "-p" in args:
+    # vmaf or proxy pass, write a synthetic per-frame log where the script asks for it
+    with open(args[args.index("-p") + 1], "r") as file:
+        script = file.read()
+    csv_frames = int(os.environ.get("BENCH_CSV_FRAMES", str(frames)))
+    # quality falls with crf and differs a little per test value, so bd-rate has something to fit
+    match = re.search(r'LWLibavSource\(r"(.+?)\.q([0-9.]+)_fin', script)
+    base = 100 - float(match.group(2)) + sum(map(ord, match.group(1))) % 7 * 0.1 if match else 90
+    match = re.search(r'log_path="(.+?)"', script)
+    if match:
+        with open(match.group(1), "w") as file:
+            file.write("Frame,psnr_y,psnr_hvs,float_ssim,vmaf\n")
+            for n in range(csv_frames):
+                file.write(f"{{n}},{{base / 2 + n % 7 * 0.25:.6f}},{{base / 2 - 2 + n % 5 * 0.3:.6f}},{{base / 110 + n % 3 * 0.001:.6f}},{{base + n % 11 * 0.05:.6f}}\n")
+    match = re.search(r'open\(r"(.+?_proxy\.csv)", "w"\)', script)
+    if match:
+        with open(match.group(1), "w") as file:
+            file.write("Frame,psnr_y\n")
+            for n in range(csv_frames):
+                file.write(f"{{n}},{{base / 2 + n % 7 * 0.25:.6f}}\n")
+    sys.exit(0)
+
+out = sys.stdout.buffer
+out.write(f"YUV4MPEG2 W{{width}} H{{height}} F24000:1001 Ip A1:1 C420jpeg\n".encode())
+frame = b"FRAME\n" + bytes(width * height * 3 // 2)
+for n in range(frames):
+    out.write(frame)
+out.flush()
+'''
+
+fake_encoder = r'''#!{python}
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+rate = float(os.environ.get("BENCH_RATE", "0"))
+crf = float(args[args.index("--crf") + 1]) if "--crf" in args else 24
+bitrate = 20000 * 0.9 ** crf * (1 + sum(map(ord, " ".join(args))) % 5 * 0.02)
+backspace = os.environ.get("BENCH_BACKSPACE", "0") == "1"
+output = args[args.index("-o") + 1] if "-o" in args else None
+
+frames = 0
+data = sys.stdin.buffer
+data.readline()
+while True:
+    header = data.readline()
+    if not header:
+        break
+    data.read(64 * 36 * 3 // 2)
+    frames += 1
+
+start = time.monotonic()
+last = ""
+written = 0
+for n in range(1, frames + 1):
+    line = f"[{{n * 100 / frames:.1f}}%] {{n}}/{{frames}} frames, {{500 + n % 13:.2f}} fps, {{1234 + n % 17:.2f}} kb/s, eta 0:00:{{(frames - n) % 60:02d}}"
+    line = "\b" * len(last) + line if backspace else "\r" + line
+    sys.stderr.write(line)
+    written += len(line)
+    last = line[len(last):] if backspace else line[1:]
+    sys.stderr.flush()
+    if rate:
+        delay = start + n / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+line = f"\nencoded {{frames}} frames in {{max(time.monotonic() - start, 0.01):.2f}}s (500.00 fps), {{bitrate:.2f}} kb/s, Avg QP:30.00\n"
+sys.stderr.write(line)
+written += len(line)
+if output:
+    with open(output, "wb") as file:
+        file.write(os.urandom(1024) * max(frames // 8, 1))
+    # raw stderr size, the harness log has backspaces already applied
+    with open(output + ".stderr", "w") as file:
+        file.write(str(written))
+'''
+
+
+def install_fakes(path: str):
+    for name, body in (("vspipe", fake_vspipe), ("x265", fake_encoder)):
+        exe = os.path.join(path, name)
+        with open(exe, "w") as file:
+            file.write(body.format(python=sys.executable))
+        os.chmod(exe, 0o755)
+    os.environ["PATH"] = path + os.pathsep + os.environ["PATH"]
+
+    with open(os.path.join(path, "src.vpy"), "w") as file:
+        file.write(
+            "import vapoursynth as vs\ncore=vs.core\n"
+            'src=core.lsmas.LWLibavSource(r"src.mkv")\nsrc.set_output()\n'
+        )
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextlib.contextmanager
+def silenced():
+    # fd level as well, utils.cls and the metric passes write straight to the terminal
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, "w") as null:
+        os.dup2(null.fileno(), 1)
+        os.dup2(null.fileno(), 2)
+        try:
+            with contextlib.redirect_stderr(null), contextlib.redirect_stdout(null):
+                yield
+        finally:
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            for fd in saved:
+                os.close(fd)
+
+
+def make_encode(name: str):
+    return ett.encode(
+        cmd='vspipe  -c y4m "{i}" -|x265 --y4m --crf 24 {passopt} -o "{o}" -',
+        i="src.vpy",
+        o=name,
+        suffix=".265",
+        i_charset="utf-8",
+        twopass=False,
+        vmaf_model=0,
+        extra_metrics=["psnr-y", "psnr-hvs", "ssim"],
+    )
+
+
+def bench_encode(frames: int, rate: float, backspace: bool):
+    os.environ["BENCH_FRAMES"] = str(frames)
+    os.environ["BENCH_RATE"] = str(rate)
+    os.environ["BENCH_BACKSPACE"] = "1" if backspace else "0"
+
+    name = "capture_bs" if backspace else "capture"
+    enc = make_encode(name)
+    with silenced():
+        cpu = cpu_time()
+        enc.encoder()
+        cpu = cpu_time() - cpu
+
+    with open(f"{name}.265.stderr", "r") as file:
+        size = int(file.read())
+    # RUSAGE_SELF leaves out vspipe and the encoder, wall time would not
+    return {
+        "harness_cpu_us_per_frame": cpu / frames * 1e6,
+        "log_capture_cpu_us_per_kb": cpu / (size / 1024) * 1e6,
+    }
+
+
+def bench_sweep(frames: int, rate: float, values: int = 3):
+    # whole tester run in screen mode: encode, proxy pass, then the full vmaf pass
+    # for the finalists, all parsed and journaled by the harness
+    os.environ["BENCH_FRAMES"] = str(frames)
+    os.environ["BENCH_RATE"] = str(rate)
+    os.environ["BENCH_BACKSPACE"] = "0"
+
+    quality = [20, 24, 28, 32]
+    test = ett.tester(
+        src="src.vpy",
+        encoder="x265",
+        base_args='--y4m --crf {q} --{test} {passopt} -o "{o}" -',
+        test_arg="preset",
+        value=list(range(values)),
+        quality=quality,
+        suffix=".265",
+        workspace="sweep",
+        screen="top",
+        screen_top=1,
+    )
+    cwd = os.getcwd()
+    try:
+        with silenced():
+            cpu = cpu_time()
+            test.run()
+            cpu = cpu_time() - cpu
+    finally:
+        os.chdir(cwd)
+    if test.fail or len(test.result) != values:
+        raise RuntimeError(f"sweep failed: {test.fail}")
+    return {"sweep_harness_cpu_us_per_frame": cpu / (frames * values * len(quality)) * 1e6}
+
+
+def bench_metrics(frames: int):
+    path = "metrics.csv"
+    with open(path, "w") as file:
+        file.write("Frame,psnr_y,psnr_hvs,float_ssim,vmaf\n")
+        for n in range(frames):
+            file.write(
+                f"{n},{40 + random.random():.6f},{38 + random.random():.6f},"
+                f"{0.95 + random.random() / 20:.6f},{90 + random.random() * 5:.6f}\n"
+            )
+    size = os.path.getsize(path)
+    wall = time.perf_counter()
+    ett.utils.calc_score(path)
+    wall = time.perf_counter() - wall
+    return {"metric_ingest_mb_s": size / wall / 2**20}
+
+
+def bench_report(series: int, points: int = 5):
+    workspace = f"report_{series}"
+    os.mkdir(workspace)
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        test = ett.tester(
+            src="../src.vpy",
+            encoder="x265",
+            base_args='--y4m --crf {q} --{test} {passopt} -o "{o}" -',
+            test_arg="preset",
+            value=list(range(series)),
+            workspace=".",
+        )
+        for n, name in enumerate(test.testlist):
+            data = [
+                {
+                    "q": q,
+                    "bitrate": 5000 / (i + 1) * (1 + n / series / 10),
+                    "speed": 10 + n,
+                    "ssim": 0.95 + i / 100,
+                    "vmaf": 90 + i - n / series,
+                }
+                for i, q in enumerate(range(20, 20 + points * 3, 3))
+            ]
+            test.result.append(
+                {"test": name, "data": data, "bdrate-vmaf": n / 10, "bdrate-ssim": n / 10}
+            )
+        wall = time.perf_counter()
+        test.report()
+        wall = time.perf_counter() - wall
+    finally:
+        os.chdir(cwd)
+    return {f"report_s_{series}_series": wall}
+
+
+def version():
+    try:
+        sp = subprocess.run(
+            "git describe --always --dirty",
+            shell=True,
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return sp.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def compare(record: dict, history: list):
+    previous = history[-1]["results"] if history else {}
+    for key, val in record["results"].items():
+        line = f"{key:<32}{val:>14.3f}"
+        if key in previous and previous[key]:
+            line += f"  ({(val / previous[key] - 1) * 100:+.1f}% vs {history[-1]['version']})"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the harness overhead with stand-in vspipe/encoder')
+
+    parser.add_argument('--frames', type=int, default=5000,
+                        help='Frames emitted by the fake encoder (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='Progress lines per second from the fake encoder, 0 for unthrottled (default: %(default)s)')
+    parser.add_argument('--csv-frames', type=int, default=200000,
+                        help='Rows in the synthetic metric CSV (default: %(default)s)')
+    parser.add_argument('--series', type=int, nargs='+', default=[1, 10, 50],
+                        help='Series counts for report generation (default: %(default)s)')
+    parser.add_argument('--history', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_history.jsonl'),
+                        help='File results are appended to (default: %(default)s)')
+    parser.add_argument('--label', default='',
+                        help='Version label stored with the results (default: git describe)')
+
+    args = parser.parse_args()
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history, "r") as file:
+            history = [json.loads(i) for i in file if i.strip()]
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="ett_bench_")
+    cwd = os.getcwd()
+    try:
+        install_fakes(workdir)
+        os.chdir(workdir)
+        results.update(bench_encode(args.frames, args.rate, backspace=False))
+        results.update(
+            {
+                f"{i}_backspace": j
+                for i, j in bench_encode(args.frames, args.rate, backspace=True).items()
+            }
+        )
+        results.update(bench_sweep(args.frames, args.rate))
+        results.update(bench_metrics(args.csv_frames))
+        for series in args.series:
+            results.update(bench_report(series))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    record = {
+        "version": args.label or version(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "frames": args.frames,
+        "rate": args.rate,
+        "csv_frames": args.csv_frames,
+        "results": results,
+    }
+    compare(record, history)
+
+    with open(args.history, "a") as file:
+        file.write(json.dumps(record) + "\n")
@@ -8,8 +8,19 @@ import shutil
 import csv
 import statistics
 import argparse
-
-from pyecharts.charts import Line
+import json
+import time
+import itertools
+import random
+import multiprocessing
+import concurrent.futures
+import ctypes
+import platform
+
+if os.name != "nt":
+    import resource
+
+from pyecharts.charts import Line, Scatter
 import pyecharts.options as opts
 from pyecharts.globals import ThemeType
 from pyecharts.commons import utils as pyecharts_utils
@@ -66,7 +77,8 @@ class utils:
                     or line.get("vmaf_b_bagging")
                     or line.get("vmaf_4k")
                 )
-                scores["vmaf"].append(float(vmaf_val))
+                if vmaf_val is not None:
+                    scores["vmaf"].append(float(vmaf_val))
 
         scores_mean = {}
         for i, j in scores.items():
@@ -81,6 +93,106 @@ class utils:
         else:
             os.system("clear")
 
+    @staticmethod
+    def clip_info(path: str):
+        sp = subprocess.run(
+            f'vspipe --info "{path}" -', shell=True, capture_output=True, text=True
+        )
+        info = sp.stdout + sp.stderr
+        frames = re.search(r"Frames:\s*([0-9]+)", info)
+        fps = re.search(r"FPS:\s*([0-9]+)/([0-9]+)", info)
+        return {
+            "frames": int(frames.group(1)) if frames else None,
+            "fps": int(fps.group(1)) / int(fps.group(2))
+            if fps and int(fps.group(2))
+            else None,
+        }
+
+    @staticmethod
+    def frame_count(path: str):
+        return utils.clip_info(path)["frames"]
+
+    @staticmethod
+    def children_cpu():
+        # cpu seconds of every waited-for child, vspipe and the encoder included
+        if os.name == "nt":
+            return None
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def cpu_time(path: str):
+        # encode.encoder appends it to the log, older logs do not have it
+        with open(path, "r") as file:
+            match = re.search(r"^cpu time: ([0-9.]+) s$", file.read(), re.M)
+        return float(match.group(1)) if match else None
+
+    @staticmethod
+    def duration(path: str):
+        info = utils.clip_info(path)
+        if info["frames"] is None or not info["fps"]:
+            return None
+        return info["frames"] / info["fps"]
+
+    @staticmethod
+    def bd_rate(ref_rate, ref_score, test_rate, test_score):
+        def prepare_data(rate, score):
+            pairs = sorted(zip(rate, score), key=lambda x: x[0])
+            seen = set()
+            unique_pairs = []
+            for r, s in pairs:
+                if r not in seen:
+                    seen.add(r)
+                    unique_pairs.append((r, s))
+            if not unique_pairs:
+                return [], []
+            return map(list, zip(*unique_pairs))
+
+        ref_rate_clean, ref_score_clean = prepare_data(ref_rate, ref_score)
+        test_rate_clean, test_score_clean = prepare_data(test_rate, test_score)
+
+        if len(ref_rate_clean) < 4 or len(test_rate_clean) < 4:
+            return "insufficient data"
+
+        return bd.bd_rate(
+            ref_rate_clean,
+            ref_score_clean,
+            test_rate_clean,
+            test_score_clean,
+            method="akima",
+        )
+
+    @staticmethod
+    def pareto(points: list):
+        # points are (speed, bdrate, key), faster and lower bd-rate is better
+        frontier = []
+        best = None
+        for speed, rate, key in sorted(points, key=lambda x: (-x[0], x[1])):
+            if best is None or rate < best:
+                best = rate
+                frontier.append(key)
+        return frontier
+
+    @staticmethod
+    def sign_flip_test(diff: list, rounds: int = 10000):
+        # paired permutation test on the mean difference, exact for small samples
+        if not diff:
+            return 1.0
+        observed = abs(sum(diff)) - 1e-12
+        if len(diff) <= 16:
+            flips = itertools.product((1, -1), repeat=len(diff))
+            total = 2 ** len(diff)
+        else:
+            rng = random.Random(0)
+            flips = ([rng.choice((1, -1)) for _ in diff] for _ in range(rounds))
+            total = rounds
+        hits = sum(abs(sum(s * d for s, d in zip(f, diff))) >= observed for f in flips)
+        return hits / total
+
+    @staticmethod
+    def safe_name(test: str):
+        return "".join(i if i not in r'\/:*?"<>|' else "_" for i in test)
+
     vmaf_model_list = ["vmaf", "vmaf_neg", "vmaf_b_bagging", "vmaf_4k"]
     feature_id = {"psnr-y": 0, "psnr-hvs": 1, "ssim": 2}
 
@@ -167,6 +279,50 @@ class process_log:
         return fps, bitrate
 
 
+class journal:
+    def __init__(self, path: str = "journal.jsonl"):
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn write from a crash, everything before it is intact
+                        break
+                    self.jobs[record["job"]] = record
+            self.compact()
+        self.file = open(path, "a")
+
+    def compact(self):
+        with open(f"{self.path}.tmp", "w") as file:
+            for record in self.jobs.values():
+                file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def state(self, job: str):
+        return self.jobs.get(job, {}).get("state")
+
+    def data(self, job: str):
+        return self.jobs.get(job, {}).get("data")
+
+    def commit(self, job: str, state: str, data=None):
+        record = {"job": job, "state": state}
+        if data is not None:
+            record["data"] = data
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.jobs[job] = record
+
+    def queue(self, job: str):
+        if job not in self.jobs:
+            self.commit(job, "queued")
+
+
 class encode:
     def __init__(
         self,
@@ -178,6 +334,10 @@ class encode:
         twopass,
         vmaf_model,
         extra_metrics,
+        proxy_step=10,
+        proxy_scale=2,
+        journal=None,
+        threads=None,
     ):
         self.cmd = cmd
         self.input = i
@@ -187,11 +347,16 @@ class encode:
         self.twopass = twopass
         self.vmaf_model = vmaf_model
         self.feature = [utils.feature_id[i] for i in extra_metrics]
+        self.proxy_step = proxy_step
+        self.proxy_scale = proxy_scale
+        self.journal = journal
+        self.threads = threads
 
     def encoder(self):
         cmd = self.cmd.format(
             i=self.input, o=self.output + self.suffix, passopt="{passopt}"
         )
+        cpu = utils.children_cpu()
         if self.twopass:
             cmd1 = cmd.format(passopt=f'--pass 1 --stats "{self.output}_2pass.log"')
             cmd = cmd.format(passopt=f'--pass 2 --stats "{self.output}_2pass.log"')
@@ -218,6 +383,8 @@ class encode:
 
                 with open(f"{self.output}.log", "w") as file:
                     file.write(utils.applybackspace(logtext))
+                    if cpu is not None:
+                        file.write(f"\ncpu time: {utils.children_cpu() - cpu:.3f} s\n")
                 return stats == 0
             else:
                 info = sp.stderr.read(1)
@@ -236,6 +403,8 @@ class encode:
         match = rex.search(script)
         clip = match.group(1)
         script = rex.sub("", script)
+        if self.threads:
+            script += f"core.num_threads={self.threads}\n"
         script += f'rip=core.lsmas.LWLibavSource(r"{self.output}_fin{self.suffix}")\n'
         script += f"rip=core.resize.Spline36(rip,{clip}.width,{clip}.height,format={clip}.format)\n"
         script += f'last=core.vmaf.VMAF({clip},rip, model={self.vmaf_model},log_path="{self.output}.csv", log_format=2, feature={self.feature})\n'
@@ -247,29 +416,92 @@ class encode:
         sp = subprocess.run('vspipe -p "vmaf.vpy" .', shell=True)
         return sp.returncode == 0
 
-    def run(self):
-        if os.path.exists(f"{self.output}_fin.csv"):
+    def proxy(self):
+        rex = re.compile(r"(.+)\.set_output\(0?\)")
+
+        with open(self.input, "r", encoding=self.charset) as file:
+            script = file.read()
+
+        match = rex.search(script)
+        clip = match.group(1)
+        script = rex.sub("", script)
+        script += "import math\nimport vapoursynth as vs\n"
+        if self.threads:
+            script += f"core.num_threads={self.threads}\n"
+        script += f'open(r"{self.output}_proxy.csv", "w").write("Frame,psnr_y\\n")\n'
+        script += f'rip=core.lsmas.LWLibavSource(r"{self.output}_fin{self.suffix}")\n'
+        script += f"rip=core.resize.Spline36(rip,{clip}.width,{clip}.height,format={clip}.format)\n"
+        script += "def luma(c):\n"
+        script += f"    c=core.std.ShufflePlanes(core.std.SelectEvery(c,{self.proxy_step},0),0,vs.GRAY)\n"
+        script += f"    return core.resize.Bilinear(c,c.width//{self.proxy_scale},c.height//{self.proxy_scale},format=vs.GRAYS)\n"
+        script += f'diff=core.std.PlaneStats(core.std.Expr([luma({clip}),luma(rip)],"x y - dup *"))\n'
+        script += "def log(n, f):\n"
+        script += f'    with open(r"{self.output}_proxy.csv", "a") as file:\n'
+        script += '        file.write(f"{n},{-10 * math.log10(max(f.props.PlaneStatsAverage, 1e-10))}\\n")\n'
+        script += "    return f\n"
+        script += "last=core.std.ModifyFrame(diff,diff,log)\n"
+        script += "last.set_output()"
+
+        with open("proxy.vpy", "w", encoding=self.charset) as file:
+            file.write(script)
+
+        sp = subprocess.run('vspipe -p "proxy.vpy" .', shell=True)
+        return sp.returncode == 0
+
+    def commit(self, job: str, state: str, src: str = None, dst: str = None):
+        if src is not None:
+            if self.journal is not None:
+                with open(src, "rb") as file:
+                    os.fsync(file.fileno())
+            os.replace(src, dst)
+        if self.journal is not None:
+            self.journal.commit(job, state)
+
+    def run(self, tier="full"):
+        log = "" if tier == "full" else "_proxy"
+        scored = os.path.exists(f"{self.output}_fin{log}.csv")
+        encoded = os.path.exists(f"{self.output}_fin{self.suffix}")
+        # workspaces from before the journal only have the _fin renames to go by
+        if self.journal is not None:
+            state = self.journal.state(f"{self.output}:{tier}")
+            if state is not None:
+                scored = scored and state == "scored"
+            state = self.journal.state(self.output)
+            if state not in (None, "queued"):
+                encoded = encoded and state == "encoded"
+        if scored:
             return True
 
-        if not os.path.exists(f"{self.output}_fin{self.suffix}"):
+        if not encoded:
+            self.commit(self.output, "encoding")
             if os.path.exists(f"{self.output}{self.suffix}"):
                 os.remove(f"{self.output}{self.suffix}")
             enc = self.encoder()
             if not enc:
+                self.commit(self.output, "failed")
                 return False
             else:
-                os.rename(
-                    f"{self.output}{self.suffix}", f"{self.output}_fin{self.suffix}"
+                self.commit(
+                    self.output,
+                    "encoded",
+                    f"{self.output}{self.suffix}",
+                    f"{self.output}_fin{self.suffix}",
                 )
 
-        if os.path.exists(f"{self.output}.csv"):
-            os.remove(f"{self.output}.csv")
+        if os.path.exists(f"{self.output}{log}.csv"):
+            os.remove(f"{self.output}{log}.csv")
 
-        vmaf = self.vmaf()
-        if not vmaf:
+        score = self.vmaf() if tier == "full" else self.proxy()
+        if not score:
+            self.commit(f"{self.output}:{tier}", "failed")
             return False
         else:
-            os.rename(f"{self.output}.csv", f"{self.output}_fin.csv")
+            self.commit(
+                f"{self.output}:{tier}",
+                "scored",
+                f"{self.output}{log}.csv",
+                f"{self.output}_fin{log}.csv",
+            )
 
         return True
 
@@ -287,6 +519,11 @@ class single_tester:
         twopass,
         vmaf_model,
         extra_metrics,
+        proxy_step=10,
+        proxy_scale=2,
+        journal=None,
+        threads=None,
+        placement=None,
     ):
         self.input = i
         self.qlist = q
@@ -300,41 +537,99 @@ class single_tester:
         self.twopass = twopass
         self.vmaf_model = vmaf_model
         self.extra_metrics = extra_metrics
+        self.proxy_step = proxy_step
+        self.proxy_scale = proxy_scale
+        self.journal = journal
+        self.threads = threads
+        self.placement = placement
 
-    def run(self):
+    def run(self, tier="full"):
         mark = True
         for q in self.qlist:
-            utils.cls()
-            enc = encode(
-                cmd=self.cmd.format(q=q, i="{i}", o="{o}", passopt="{passopt}"),
-                i=self.input,
-                o=f"{self.name}.q{q}",
-                suffix=self.suffix,
-                i_charset=self.charset,
-                twopass=self.twopass,
-                vmaf_model=self.vmaf_model,
-                extra_metrics=self.extra_metrics,
-            )
-            run = enc.run()
+            run = self.run_q(q, tier)
             mark = mark and run
-            if run:
-                template = {"q": q}
-                fps, bitrate = self.log(f"{self.name}.q{q}.log")
-                if fps is None or bitrate is None:
-                    self.fail_log.append(
-                        f"fails in q{q}:consider rewrite process_log_method to process log"
-                    )
-                    mark = False
-                template["bitrate"] = bitrate
-                template["speed"] = fps
+        return mark
+
+    def run_q(self, q, tier="full"):
+        job = f"{self.name}.q{q}:{tier}"
+        if self.journal is not None and self.journal.state(job) == "parsed":
+            self.data.append(dict(self.journal.data(job)))
+            return True
+
+        utils.cls()
+        enc = encode(
+            cmd=self.cmd.format(q=q, i="{i}", o="{o}", passopt="{passopt}"),
+            i=self.input,
+            o=f"{self.name}.q{q}",
+            suffix=self.suffix,
+            i_charset=self.charset,
+            twopass=self.twopass,
+            vmaf_model=self.vmaf_model,
+            extra_metrics=self.extra_metrics,
+            proxy_step=self.proxy_step,
+            proxy_scale=self.proxy_scale,
+            journal=self.journal,
+            threads=self.threads,
+        )
+        run = enc.run(tier)
+        if run:
+            template = {"q": q}
+            fps, bitrate = self.log(f"{self.name}.q{q}.log")
+            if fps is None or bitrate is None:
+                self.fail_log.append(
+                    f"fails in q{q}:consider rewrite process_log_method to process log"
+                )
+                run = False
+            template["bitrate"] = bitrate
+            template["speed"] = fps
+            template["cpu"] = utils.cpu_time(f"{self.name}.q{q}.log")
+            if self.placement:
+                template["placement"] = self.placement
+            if tier == "proxy":
+                scores_calc = utils.calc_score(f"{self.name}.q{q}_fin_proxy.csv")
+                template["proxy-psnr-y"] = scores_calc["psnr-y"]
+            else:
                 vmaf_tab = utils.vmaf_model_list[self.vmaf_model]
                 scores_calc = utils.calc_score(f"{self.name}.q{q}_fin.csv")
                 template[vmaf_tab] = scores_calc["vmaf"]
                 for i in self.extra_metrics:
                     template[i] = scores_calc[i]
-                # template["ssim"],template["ms_ssim"],template[vmaf_tab]=utils.calc_score(f"{self.name}.q{q}_fin.csv")
-                self.data.append(template)
-        return mark
+            # template["ssim"],template["ms_ssim"],template[vmaf_tab]=utils.calc_score(f"{self.name}.q{q}_fin.csv")
+            self.data.append(template)
+            if run and self.journal is not None:
+                self.journal.commit(job, "parsed", template)
+        return run
+
+    def run_speed(self, q, r):
+        output = f"{self.name}.q{q}.r{r}"
+        if self.journal is not None and self.journal.state(output) == "parsed":
+            return self.journal.data(output)["speed"]
+        if self.journal is None and os.path.exists(f"{output}.log"):
+            fps, _ = self.log(f"{output}.log")
+            if fps is not None:
+                return fps
+
+        utils.cls()
+        enc = encode(
+            cmd=self.cmd.format(q=q, i="{i}", o="{o}", passopt="{passopt}"),
+            i=self.input,
+            o=output,
+            suffix=self.suffix,
+            i_charset=self.charset,
+            twopass=self.twopass,
+            vmaf_model=self.vmaf_model,
+            extra_metrics=self.extra_metrics,
+            threads=self.threads,
+        )
+        run = enc.encoder()
+        if os.path.exists(f"{output}{self.suffix}"):
+            os.remove(f"{output}{self.suffix}")
+        if not run:
+            return None
+        fps, _ = self.log(f"{output}.log")
+        if fps is not None and self.journal is not None:
+            self.journal.commit(output, "parsed", {"speed": fps})
+        return fps
 
     def getdata(self):
         return self.data
@@ -351,6 +646,123 @@ class single_tester:
                 )
 
 
+class budget_planner:
+    def __init__(self, budget: float, history: str = "costs.json", min_points=4):
+        self.budget = budget
+        self.start = time.monotonic()
+        self.history_path = history
+        self.min_points = min_points
+        self.history = {}
+        if os.path.exists(history):
+            with open(history, "r") as file:
+                self.history = json.load(file)
+        self.probe = {}
+        self.probe_estimated = 0.0
+        self.probe_actual = 0.0
+        self.skipped = []
+
+    def remaining(self):
+        return self.budget - (time.monotonic() - self.start)
+
+    def correction(self):
+        # probes only see the first frames, learn how far off they are
+        if self.probe_estimated > 0 and self.probe_actual > 0:
+            return self.probe_actual / self.probe_estimated
+        return 1.0
+
+    def needs_probe(self, st, qlist: list):
+        if self.history.get(st.name):
+            return False
+        return not all(os.path.exists(f"{st.name}.q{q}_fin.csv") for q in qlist)
+
+    def estimate(self, st, q):
+        if os.path.exists(f"{st.name}.q{q}_fin.csv"):
+            return 0.0
+        past = self.history.get(st.name, {})
+        if str(q) in past:
+            return past[str(q)]
+        if past:
+            return statistics.fmean(past.values())
+        return self.probe.get(st.name, 0.0) * self.correction()
+
+    def run_probe(self, st, q, frames: int, total: int):
+        # startup, indexing and model loading do not grow with the clip, so
+        # probe two lengths and only scale the per frame part to the full clip
+        short = max(frames // 4, 1)
+        long_cost = self.probe_cost(st, q, frames)
+        if long_cost is None:
+            self.probe[st.name] = 0.0
+            return
+        short_cost = self.probe_cost(st, q, short) if short < frames else None
+        if short_cost is None or long_cost <= short_cost:
+            # too short or too noisy to tell them apart
+            self.probe[st.name] = long_cost * total / frames
+            return
+        per_frame = (long_cost - short_cost) / (frames - short)
+        fixed = max(short_cost - per_frame * short, 0.0)
+        self.probe[st.name] = fixed + per_frame * total
+
+    def probe_cost(self, st, q, frames: int):
+        rex = re.compile(r"(.+)\.set_output\(0?\)")
+
+        with open(st.input, "r", encoding=st.charset) as file:
+            script = file.read()
+
+        match = rex.search(script)
+        clip = match.group(1)
+        script = rex.sub("", script)
+        script += f"{clip}[:{frames}].set_output()"
+
+        with open("probe.vpy", "w", encoding=st.charset) as file:
+            file.write(script)
+
+        utils.cls()
+        enc = encode(
+            cmd=st.cmd.format(q=q, i="{i}", o="{o}", passopt="{passopt}"),
+            i="probe.vpy",
+            o=f"{st.name}.probe",
+            suffix=st.suffix,
+            i_charset=st.charset,
+            twopass=st.twopass,
+            vmaf_model=st.vmaf_model,
+            extra_metrics=st.extra_metrics,
+            threads=st.threads,
+        )
+        begin = time.monotonic()
+        run = enc.run()
+        cost = time.monotonic() - begin
+        for i in os.listdir("."):
+            if i.startswith(f"{st.name}.probe"):
+                os.remove(i)
+        return cost if run else None
+
+    def record(self, st, q, cost: float, probed: bool):
+        # a failed probe has no estimate to check against
+        if probed and self.probe.get(st.name, 0.0) > 0:
+            self.probe_estimated += self.probe[st.name]
+            self.probe_actual += cost
+        self.history.setdefault(st.name, {})[str(q)] = cost
+        with open(f"{self.history_path}.tmp", "w") as file:
+            json.dump(self.history, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f"{self.history_path}.tmp", self.history_path)
+
+    def first_points(self, qlist: list):
+        if len(qlist) <= self.min_points:
+            return list(qlist)
+        step = (len(qlist) - 1) / (self.min_points - 1)
+        return [qlist[round(i * step)] for i in range(self.min_points)]
+
+    def fits(self, cost: float):
+        return cost <= self.remaining()
+
+    def skip(self, test: str, q, cost: float):
+        self.skipped.append(
+            {"test": test, "q": q, "estimate": f"{cost / 60:.1f}&ensp;min"}
+        )
+
+
 class chart:
     def __init__(self, title: str, output: str, vmaf_model):
         self.title = title
@@ -398,6 +810,9 @@ class chart:
 
     def render(self):
         all_bitrate = sum([[t[0] for t in i["data"]] for i in self.datas], [])
+        if not all_bitrate:
+            self.chart.render(self.output)
+            return
         maxb = max(all_bitrate)
         minb = min(all_bitrate)
         delta = maxb - minb
@@ -437,6 +852,125 @@ class chart:
         self.add(data, name)
 
 
+class pareto_analysis:
+    def __init__(self, result: list, metrics: list, output: str = "pareto.html"):
+        self.result = result
+        self.metrics = metrics
+        self.output = output
+        self.points = {}
+        self.frontier = {}
+        # cpu seconds per encode where every point has them, else wall time per frame
+        self.cpu = all(
+            i.get("cpu") for r in result for i in r["data"] if i["speed"]
+        )
+
+    def cost(self, data: list):
+        data = [i for i in data if i["speed"]]
+        if not data:
+            return None
+        if self.cpu:
+            return statistics.fmean(i["cpu"] for i in data)
+        return 1 / statistics.harmonic_mean([i["speed"] for i in data])
+
+    def run(self):
+        for metric in self.metrics:
+            points = []
+            for r in self.result:
+                rate = r.get(f"bdrate-{metric}")
+                cost = self.cost(r["data"])
+                if isinstance(rate, (float, int)) and cost:
+                    points.append((cost, rate, r["test"]))
+            if len(points) < 2:
+                continue
+            self.points[metric] = points
+
+            lookup = {i[2]: i for i in points}
+            rows = []
+            for test in utils.pareto([(-i[0], i[1], i[2]) for i in points]):
+                cost, rate, _ = lookup[test]
+                row = {
+                    "test": test,
+                    "cost": cost,
+                    "bdrate": rate,
+                    "extra-cost": "",
+                    "gain": "",
+                }
+                if rows:
+                    prev = rows[-1]
+                    extra = cost - prev["cost"]
+                    row["extra-cost"] = extra
+                    row["gain"] = (prev["bdrate"] - rate) / extra if extra > 0 else ""
+                rows.append(row)
+            self.frontier[metric] = rows
+        return self.frontier
+
+    def table(self, metric: str):
+        def process(x, y):
+            val = x[y]
+            if y == "test" or val == "":
+                return str(val)
+            if y == "bdrate":
+                return f"{val:.02f}%"
+            if y == "gain":
+                if self.cpu:
+                    return f"{val:.04f}%&ensp;per&ensp;cpu&ensp;s"
+                return f"{val / 1000:.04f}%&ensp;per&ensp;ms/frame"
+            if self.cpu:
+                return f"{val:.02f}&ensp;cpu&ensp;s"
+            return f"{val * 1000:.02f}&ensp;ms/frame"
+
+        return (
+            f"pareto frontier ({metric}, {'cpu time per encode' if self.cpu else 'wall time per frame'})",
+            self.frontier[metric],
+            ["test", "cost", "bdrate", "extra-cost", "gain"],
+            process,
+        )
+
+    def render(self):
+        scatter = Scatter(
+            init_opts=opts.InitOpts(
+                page_title="pareto frontier",
+                theme=ThemeType.DARK,
+                width="1280px",
+                height="720px",
+            )
+        )
+        # every item carries its own [cost, bd-rate, name], no shared x axis
+        scatter.add_xaxis([])
+        scale, unit = (1, "cpu s") if self.cpu else (1000, "ms/frame")
+        for metric, points in self.points.items():
+            frontier = {i["test"] for i in self.frontier[metric]}
+            scatter.add_yaxis(
+                metric,
+                [[i[0] * scale, i[1], i[2]] for i in points if i[2] not in frontier],
+                label_opts=opts.LabelOpts(is_show=False),
+                symbol_size=6,
+            )
+            scatter.add_yaxis(
+                f"{metric} frontier",
+                [[i["cost"] * scale, i["bdrate"], i["test"]] for i in self.frontier[metric]],
+                label_opts=opts.LabelOpts(is_show=False),
+                symbol_size=12,
+            )
+        scatter.set_global_opts(
+            title_opts=opts.TitleOpts(title="cost vs bd-rate"),
+            xaxis_opts=opts.AxisOpts(
+                type_="value", is_scale=True, split_number=10, name=f"cost/{unit}"
+            ),
+            yaxis_opts=opts.AxisOpts(type_="value", is_scale=True, name="bd-rate/%"),
+            legend_opts=opts.LegendOpts(pos_top="bottom"),
+            tooltip_opts=opts.TooltipOpts(
+                is_show=True,
+                formatter=pyecharts_utils.JsCode(
+                    "function(x) {return x.data[2] + '<br/>cost&nbsp;&nbsp;'+ x.data[0].toFixed(2) + '&nbsp;"
+                    + unit.replace(" ", "&nbsp;")
+                    + "<br/>bd-rate&nbsp;&nbsp;' + x.data[1].toFixed(2) + '%';}"
+                ),
+            ),
+        )
+        scatter.render(self.output)
+
+
 class htmlreport:
     def __init__(self, html: str):
         self.soup = BeautifulSoup(html, "html.parser")
@@ -525,11 +1059,339 @@ class htmlreport:
         )
         self.soup.body.append(BeautifulSoup(table, "html.parser"))
 
+    def addchart(self, html: str):
+        soup = BeautifulSoup(html, "html.parser")
+        for i in list(soup.body.children):
+            self.soup.body.append(i)
+
     def save(self, path: str):
         with open(path, "w", encoding="utf-8") as file:
             file.write(self.soup.prettify())
 
 
+class placement:
+    thread_args = {
+        "x264": "--threads {n}",
+        # a bare count lets a libnuma x265 spread over every node, name the slot's one
+        "x265": "--pools {pools}",
+        "svtav1": "--lp {n}",
+        "vpxenc": "--threads={n}",
+    }
+
+    def __init__(self, slots: int = 1):
+        self.nodes = placement.topology()
+        self.slots = self.split(slots)
+
+    @staticmethod
+    def cpulist(text: str):
+        cpus = []
+        for part in text.strip().split(","):
+            if "-" in part:
+                a, b = part.split("-")
+                cpus += range(int(a), int(b) + 1)
+            elif part:
+                cpus.append(int(part))
+        return cpus
+
+    @staticmethod
+    def topology():
+        # node -> physical cores -> sibling threads, limited to the cpus we may run on
+        allowed = os.sched_getaffinity(0)
+        nodes = {}
+        for path in sorted(
+            pathlib.Path("/sys/devices/system/node").glob("node[0-9]*"),
+            key=lambda x: int(x.name[4:]),
+        ):
+            cores = {}
+            for cpu in placement.cpulist((path / "cpulist").read_text()):
+                if cpu not in allowed:
+                    continue
+                siblings = pathlib.Path(
+                    f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"
+                )
+                core = (
+                    min(placement.cpulist(siblings.read_text()))
+                    if siblings.exists()
+                    else cpu
+                )
+                cores.setdefault(core, []).append(cpu)
+            if cores:
+                nodes[int(path.name[4:])] = list(cores.values())
+        if not nodes:
+            nodes = {0: [[i] for i in sorted(allowed)]}
+        return nodes
+
+    def split(self, slots: int):
+        # spread slots over nodes first, then hand each slot whole cores of its node
+        node_ids = list(self.nodes)
+        owners = {i: [] for i in node_ids}
+        for slot in range(slots):
+            owners[node_ids[slot % len(node_ids)]].append(slot)
+
+        result = [None] * slots
+        for node, members in owners.items():
+            cores = self.nodes[node]
+            for n, slot in enumerate(members):
+                if len(members) > len(cores):
+                    # more slots than cores, they have to share
+                    share = [cores[n % len(cores)]]
+                else:
+                    share = cores[
+                        n * len(cores) // len(members) : (n + 1)
+                        * len(cores)
+                        // len(members)
+                    ]
+                result[slot] = {"node": node, "cpus": sorted(sum(share, []))}
+        return result
+
+    @staticmethod
+    def threadopt(encoder: str, slot: dict):
+        n = len(slot["cpus"])
+        pools = ",".join(["-"] * slot["node"] + [str(n)])
+        return placement.thread_args.get(encoder, "").format(n=n, pools=pools)
+
+    @staticmethod
+    def label(slot: dict):
+        cpus = slot["cpus"]
+        ranges = []
+        start = prev = cpus[0]
+        for cpu in cpus[1:] + [None]:
+            if cpu is None or cpu != prev + 1:
+                ranges.append(f"{start}-{prev}" if start != prev else str(start))
+                start = cpu
+            prev = cpu
+        # only claim the node when its memory policy actually took
+        node = f"node{slot['node']}" if slot.get("membind") else "cpus"
+        return f"{node}:{','.join(ranges)}"
+
+    @staticmethod
+    def apply(slot: dict):
+        # children (vspipe, encoder) inherit both the cpu set and the memory policy
+        os.sched_setaffinity(0, slot["cpus"])
+        slot["membind"] = False
+        nr = {"x86_64": 238, "aarch64": 237, "ppc64le": 261}.get(platform.machine())
+        if nr is None:
+            print(f"memory policy not supported on {platform.machine()}, pinning cpus only")
+            return
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+        except OSError as e:
+            print(f"set_mempolicy unavailable: {str(e)}, pinning cpus only")
+            return
+        mask = (ctypes.c_ulong * 16)()
+        mask[slot["node"] // 64] = 1 << (slot["node"] % 64)
+        # MPOL_PREFERRED, so a full node spills over instead of failing
+        if libc.syscall(nr, 1, mask, ctypes.sizeof(mask) * 8) == -1:
+            errno = ctypes.get_errno()
+            print(f"set_mempolicy for node{slot['node']} failed: {os.strerror(errno)}, pinning cpus only")
+            return
+        slot["membind"] = True
+
+
+class corpus:
+    def __init__(
+        self,
+        sources: list,
+        workspace: str,
+        jobs: int = 0,
+        weight: str = "duration",
+        numa: bool = False,
+        **kwargs,
+    ):
+        self.workspace = pathlib.Path(workspace).absolute()
+        # one source per group of physical cores keeps the machine busy without
+        # every encoder fighting over all of it
+        cores = sum(len(i) for i in placement.topology().values())
+        self.jobs = jobs or max(min(len(sources), cores // corpus.slot_cores), 1)
+        self.weight = weight
+        # parallel sources are always pinned, unpinned ones measure contention
+        self.pinned = numa or self.jobs > 1
+        self.kwargs = kwargs
+        self.metrics = ["vmaf"] + kwargs.get("extra_metrics", ["ssim"])
+        self.summary = []
+        self.aggregate = []
+
+        self.sources = {}
+        for src in sources:
+            name = pathlib.Path(src).stem
+            if name in self.sources:
+                name += f"_{len(self.sources)}"
+            self.sources[name] = src
+
+    @staticmethod
+    def expand(paths: list):
+        sources = []
+        for path in paths:
+            if os.path.isdir(path):
+                sources += sorted(str(i) for i in pathlib.Path(path).glob("*.vpy"))
+            else:
+                sources.append(path)
+        return [os.path.abspath(i) for i in sources]
+
+    slot = None
+    slot_cores = 4
+
+    @staticmethod
+    def init_worker(slots):
+        corpus.slot = slots.get()
+        placement.apply(corpus.slot)
+
+    @staticmethod
+    def worker(name: str, kwargs: dict):
+        os.makedirs(kwargs["workspace"], exist_ok=True)
+        # keep parallel sources from writing over each other on the console
+        log = os.open(
+            os.path.join(kwargs["workspace"], "run.log"),
+            os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+        )
+        os.dup2(log, 1)
+        os.dup2(log, 2)
+
+        duration = utils.duration(kwargs["src"])
+        test = tester(**kwargs, slot=corpus.slot)
+        try:
+            test.run()
+            test.report()
+        except Exception as e:
+            print(f"{name} failed: {str(e)}")
+            test.fail.append(name)
+        return {
+            "source": name,
+            "result": test.result,
+            "fail": test.fail,
+            "duration": duration,
+            "verdict": test.verdict(),
+        }
+
+    def run(self):
+        tasks = [
+            (name, dict(self.kwargs, src=src, workspace=str(self.workspace / name)))
+            for name, src in self.sources.items()
+        ]
+        # longest sources first so the pool does not end on one straggler
+        tasks.sort(key=lambda x: utils.duration(x[1]["src"]) or 0, reverse=True)
+        attempts = {name: 0 for name, _ in tasks}
+        self.summary = []
+        while tasks:
+            tasks = self.run_pool(tasks, attempts)
+        self.summary.sort(key=lambda x: list(self.sources).index(x["source"]))
+        self.combine()
+
+    def run_pool(self, tasks: list, attempts: dict):
+        # a killed worker (oom) breaks the whole pool, hand back what has to run again
+        if self.pinned:
+            slots = multiprocessing.Queue()
+            for slot in placement(self.jobs).slots:
+                slots.put(slot)
+            pool = concurrent.futures.ProcessPoolExecutor(
+                self.jobs, initializer=corpus.init_worker, initargs=(slots,)
+            )
+        else:
+            pool = concurrent.futures.ProcessPoolExecutor(self.jobs)
+
+        queue = list(tasks)
+        running = {}
+        retry = []
+        broken = False
+        with pool:
+            while running or (queue and not broken):
+                while queue and not broken and len(running) < self.jobs:
+                    name, kwargs = queue.pop(0)
+                    attempts[name] += 1
+                    running[pool.submit(corpus.worker, name, kwargs)] = (name, kwargs)
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    name, kwargs = running.pop(future)
+                    try:
+                        self.summary.append(future.result())
+                    except concurrent.futures.process.BrokenProcessPool:
+                        broken = True
+                        if attempts[name] < 2:
+                            retry.append((name, kwargs))
+                            continue
+                        print(f"{name} failed: worker died")
+                        self.summary.append(
+                            {
+                                "source": name,
+                                "result": [],
+                                "fail": [name],
+                                "duration": utils.duration(kwargs["src"]),
+                                "verdict": 1,
+                            }
+                        )
+        return retry + queue
+
+    def combine(self):
+        # a duration of 0 next to ones in seconds would all but drop that source
+        self.weighting = self.weight
+        if self.weight == "duration" and not all(
+            s["duration"] for s in self.summary if s["result"]
+        ):
+            self.weighting = "even"
+        tests = []
+        for s in self.summary:
+            for r in s["result"]:
+                if r["test"] not in tests:
+                    tests.append(r["test"])
+
+        for test in tests:
+            row = {"test": test}
+            for metric in self.metrics:
+                values = []
+                for s in self.summary:
+                    for r in s["result"]:
+                        val = r.get(f"bdrate-{metric}")
+                        if r["test"] == test and isinstance(val, (float, int)):
+                            w = s["duration"] if self.weighting == "duration" else 1
+                            values.append((w, val))
+                total = sum(i[0] for i in values)
+                row[metric] = (
+                    f"{sum(w * v for w, v in values) / total:.02f}%"
+                    if values
+                    else "n/a"
+                )
+            done = sum(any(r["test"] == test for r in s["result"]) for s in self.summary)
+            row["sources"] = f"{done}/{len(self.summary)}"
+            self.aggregate.append(row)
+
+    def breakdown(self, metric: str):
+        tests = [i["test"] for i in self.aggregate]
+        rows = []
+        for s in self.summary:
+            row = {
+                "source": f'<a href="{s["source"]}/report.html">{s["source"]}</a>',
+                "duration": f'{s["duration"]:.01f}&ensp;s' if s["duration"] else "",
+            }
+            bdrates = {r["test"]: r.get(f"bdrate-{metric}", "") for r in s["result"]}
+            for test in tests:
+                val = bdrates.get(test, "")
+                row[test] = f"{val:.02f}%" if isinstance(val, (float, int)) else str(val)
+            rows.append(row)
+        return rows
+
+    def verdict(self):
+        return max((i["verdict"] for i in self.summary), default=1)
+
+    def report(self):
+        report = htmlreport(
+            '<html><head><meta charset="UTF-8"><title>corpus</title></head><body></body></html>'
+        )
+        if self.aggregate:
+            title = f"corpus bd-rate ({self.weighting} weighted"
+            if self.weighting != self.weight:
+                title += ", some durations unknown"
+            report.addtable(
+                f"{title})",
+                self.aggregate,
+                ["test"] + self.metrics + ["sources"],
+            )
+            for metric in self.metrics:
+                report.addtable(f"{metric} bd-rate per source", self.breakdown(metric))
+        report.save(str(self.workspace / "report.html"))
+
+
 class tester:
     def __init__(
         self,
@@ -548,6 +1410,18 @@ class tester:
         vmaf_model=0,
         ref=0,
         extra_metrics=["ssim"],
+        time_budget=None,
+        probe_frames=60,
+        screen=None,
+        screen_top=3,
+        proxy_step=10,
+        proxy_scale=2,
+        builds=None,
+        repeats=3,
+        max_slowdown=2.0,
+        max_bdrate=0.5,
+        alpha=0.05,
+        slot=None,
     ):
         self.source = src
         self.charset = i_charset
@@ -564,18 +1438,49 @@ class tester:
             if self.argsbooltype
             else [f"{test_arg}{link}{i}" for i in value]
         )
+        self.builds = builds
+        if builds:
+            self.build_arg = self.testlist[-1]
+            # a build listed twice would share one tester but report twice
+            self.testlist = list(dict.fromkeys(builds))
         self.encoder = encoder
         self.base_args = base_args
         self.suffix = suffix
         self.chart = chart(
             title=self.encoder, output="report.html", vmaf_model=vmaf_model
         )
-        self.cmd = 'vspipe  -c y4m "{i}" -|' + self.encoder + " " + self.base_args
+        self.slot = slot
+        self.threads = len(slot["cpus"]) if slot else None
+        self.threadopt = (
+            placement.threadopt(encoder, slot) + " "
+            if slot
+            else ""
+        )
+        self.cmd = (
+            'vspipe  -c y4m "{i}" -|'
+            + self.encoder
+            + " "
+            + self.threadopt
+            + self.base_args
+        )
         self.twopass = twopass
         self.vmaf_model = vmaf_model
         self.ref = self.testlist[ref]
         self.skipbdrate = False
         self.extra_metrics = extra_metrics
+        self.time_budget = time_budget
+        self.probe_frames = probe_frames
+        self.skipped = []
+        self.screen = screen
+        self.screen_top = screen_top
+        self.proxy_step = proxy_step
+        self.proxy_scale = proxy_scale
+        self.repeats = repeats
+        self.max_slowdown = max_slowdown
+        self.max_bdrate = max_bdrate
+        self.alpha = alpha
+        self.regression = []
+        self.journal = None
 
         if process_log_method is None:
             if encoder == "x264":
@@ -600,154 +1505,403 @@ class tester:
             shutil.copy(self.source, str(self.workspace))
         os.chdir(self.workspace)
 
+    def single_tester(self, test: str):
+        if self.builds:
+            cmd = f'vspipe  -c y4m "{{i}}" -|"{test}" {self.threadopt}{self.base_args}'.format(
+                test=self.build_arg, q="{q}", i="{i}", o="{o}", passopt="{passopt}"
+            )
+        else:
+            cmd = self.cmd.format(
+                test=test, q="{q}", i="{i}", o="{o}", passopt="{passopt}"
+            )
+        return single_tester(
+            i=self.source,
+            name=utils.safe_name(test),
+            suffix=self.suffix,
+            q=self.quality,
+            cmd=cmd,
+            i_charset=self.charset,
+            process_log_method=self.process_log,
+            twopass=self.twopass,
+            vmaf_model=self.vmaf_model,
+            extra_metrics=self.extra_metrics,
+            proxy_step=self.proxy_step,
+            proxy_scale=self.proxy_scale,
+            journal=self.journal,
+            threads=self.threads,
+            placement=placement.label(self.slot) if self.slot else None,
+        )
+
+    def collect(self, test: str, st_data: list):
+        self.result.append({"test": test, "data": st_data})
+        if self.ref == test:
+            self.refdata = {
+                "rate": [i["bitrate"] for i in st_data],
+                "vmaf": [i[utils.vmaf_model_list[self.vmaf_model]] for i in st_data],
+            }
+            for i in self.extra_metrics:
+                self.refdata[i] = [j[i] for j in st_data]
+
     def run(self):
         self.init_workspace()
+        self.journal = journal("journal.jsonl")
+        for test in self.testlist:
+            for q in self.quality:
+                self.journal.queue(f"{utils.safe_name(test)}.q{q}")
+        if self.builds:
+            self.run_builds()
+            return
+        if self.time_budget:
+            self.run_budget()
+            return
+        if self.screen:
+            self.run_screen()
+            return
         for test in self.testlist:
             utils.cls()
-            cmd = self.cmd.format(
-                test=test, q="{q}", i="{i}", o="{o}", passopt="{passopt}"
-            )
-            st = single_tester(
-                i=self.source,
-                name="".join(i if i not in r'\/:*?"<>|' else "_" for i in test),
-                suffix=self.suffix,
-                q=self.quality,
-                cmd=cmd,
-                i_charset=self.charset,
-                process_log_method=self.process_log,
-                twopass=self.twopass,
-                vmaf_model=self.vmaf_model,
-                extra_metrics=self.extra_metrics,
-            )
+            st = self.single_tester(test)
             run = st.run()
             if not run:
                 self.fail.append(test)
                 self.skipbdrate = True
                 continue
-            self.result.append({"test": test, "data": st.getdata()})
-            if self.ref == test:
-                st_data = st.getdata()
-                self.refdata = {
-                    "rate": [i["bitrate"] for i in st_data],
-                    "vmaf": [
-                        i[utils.vmaf_model_list[self.vmaf_model]] for i in st_data
-                    ],
-                }
-                for i in self.extra_metrics:
-                    self.refdata[i] = [j[i] for j in st_data]
+            self.collect(test, st.getdata())
         utils.cls()
         if not self.skipbdrate:
             self.bdrate()
 
-    def bdrate(self):
-        def prepare_data(rate, score):
-            pairs = sorted(zip(rate, score), key=lambda x: x[0])
-            seen = set()
-            unique_pairs = []
-            for r, s in pairs:
-                if r not in seen:
-                    seen.add(r)
-                    unique_pairs.append((r, s))
-            if not unique_pairs:
-                return [], []
-            return map(list, zip(*unique_pairs))
+    def run_budget(self):
+        planner = budget_planner(self.time_budget * 3600)
+        testers = {test: self.single_tester(test) for test in self.testlist}
+        qlist = sorted(self.quality)
+        first = planner.first_points(qlist)
+        probe_q = qlist[len(qlist) // 2]
 
-        ref_rate, ref_vmaf = self.refdata["rate"], self.refdata["vmaf"]
-        vmaf_tab = utils.vmaf_model_list[self.vmaf_model]
-        
+        total = None
+        for test, st in testers.items():
+            if not planner.needs_probe(st, qlist):
+                continue
+            if total is None:
+                total = utils.frame_count(self.source)
+            if total:
+                planner.run_probe(st, probe_q, min(self.probe_frames, total), total)
+
+        failed = set()
+
+        def run_job(test, q):
+            st = testers[test]
+            # only the first real encode after a probe checks its estimate
+            probed = not planner.history.get(st.name)
+            cached = os.path.exists(f"{st.name}.q{q}_fin.csv")
+            begin = time.monotonic()
+            if not st.run_q(q):
+                failed.add(test)
+                return False
+            if not cached:
+                planner.record(st, q, time.monotonic() - begin, probed)
+            return True
+
+        # every value gets the points BD-rate needs before any gets refined,
+        # reference first since nothing is comparable without it
+        order = sorted(
+            self.testlist,
+            key=lambda t: (
+                t != self.ref,
+                sum(planner.estimate(testers[t], q) for q in first),
+            ),
+        )
+        for test in order:
+            cost = sum(planner.estimate(testers[test], q) for q in first)
+            # a probe alone is too rough to give up every bd-rate over
+            forced = test == self.ref and not planner.history.get(testers[test].name)
+            if not forced and not planner.fits(cost):
+                for q in first:
+                    planner.skip(test, q, planner.estimate(testers[test], q))
+                continue
+            for q in first:
+                if not run_job(test, q):
+                    break
+
+        refine = [
+            (test, q)
+            for test in order
+            for q in qlist
+            if q not in first
+            and test not in failed
+            and len(testers[test].data) >= len(first)
+        ]
+        refine.sort(key=lambda x: planner.estimate(testers[x[0]], x[1]))
+        for test, q in refine:
+            if test in failed:
+                continue
+            cost = planner.estimate(testers[test], q)
+            if not planner.fits(cost):
+                planner.skip(test, q, cost)
+                continue
+            run_job(test, q)
+
+        self.skipped = planner.skipped
+        for test in self.testlist:
+            if test in failed:
+                self.fail.append(test)
+                self.skipbdrate = True
+                continue
+            st_data = sorted(testers[test].getdata(), key=lambda x: x["q"])
+            if st_data:
+                self.collect(test, st_data)
+        if not hasattr(self, "refdata"):
+            self.skipbdrate = True
+        utils.cls()
+        if not self.skipbdrate:
+            self.bdrate()
+
+    def run_builds(self):
+        testers = {test: self.single_tester(test) for test in self.testlist}
+        speeds = {test: {} for test in self.testlist}
+        failed = set()
+
+        # interleave builds and rotate who goes first, so drift hits all of them alike
+        rounds = 0
+        for q in self.quality:
+            for r in range(self.repeats):
+                shift = rounds % len(self.testlist)
+                rounds += 1
+                for test in self.testlist[shift:] + self.testlist[:shift]:
+                    if test in failed:
+                        continue
+                    st = testers[test]
+                    if r == 0:
+                        fps = st.data[-1]["speed"] if st.run_q(q) else None
+                    else:
+                        fps = st.run_speed(q, r)
+                    if fps is None:
+                        failed.add(test)
+                        continue
+                    speeds[test].setdefault(q, []).append(fps)
+
+        for test in self.testlist:
+            if test in failed:
+                self.fail.append(test)
+                self.skipbdrate = True
+                continue
+            st_data = testers[test].getdata()
+            for i in st_data:
+                i["speed"] = statistics.median(speeds[test][i["q"]])
+            self.collect(test, st_data)
+            self.result[-1]["speed-runs"] = speeds[test]
+        utils.cls()
+        if not self.skipbdrate:
+            self.bdrate()
+        self.compare_builds()
+
+    def compare_builds(self):
+        ref = next((r for r in self.result if r["test"] == self.ref), None)
+        if ref is None:
+            return
         for r in self.result:
-            r["bdrate-vmaf"] = "calculation failed"
-            for metric in self.extra_metrics:
-                r[f"bdrate-{metric}"] = "calculation failed"
+            if r is ref:
+                continue
+            diff = []
+            for q, runs in r["speed-runs"].items():
+                for a, b in zip(ref["speed-runs"][q], runs):
+                    diff.append(b / a - 1)
+            delta = statistics.fmean(diff) * 100 if diff else 0.0
+            p = utils.sign_flip_test(diff)
+            bdrate = r.get("bdrate-vmaf")
+            reasons = []
+            if delta < -self.max_slowdown and p < self.alpha:
+                reasons.append("slower")
+            if isinstance(bdrate, (float, int)) and bdrate > self.max_bdrate:
+                reasons.append("bd-rate")
+            self.regression.append(
+                {
+                    "build": r["test"],
+                    "speed-delta": f"{delta:+.02f}%",
+                    "p-value": f"{p:.04f}",
+                    "bdrate-vmaf": f"{bdrate:+.02f}%"
+                    if isinstance(bdrate, (float, int))
+                    else str(bdrate),
+                    "result": "FAIL: " + ", ".join(reasons) if reasons else "pass",
+                }
+            )
 
-            test_rate = [i["bitrate"] for i in r["data"]]
-            test_vmaf = [i[vmaf_tab] for i in r["data"]]
-            
+    def verdict(self):
+        if self.fail or any(i["result"] != "pass" for i in self.regression):
+            return 1
+        return 0
+
+    def run_screen(self):
+        proxy = {}
+        for test in self.testlist:
+            utils.cls()
+            st = self.single_tester(test)
+            if not st.run(tier="proxy"):
+                self.fail.append(test)
+                self.skipbdrate = True
+                continue
+            proxy[test] = {"test": test, "data": st.getdata(), "tier": "proxy"}
+
+        utils.cls()
+        if self.ref not in proxy:
+            self.result = list(proxy.values())
+            self.skipbdrate = True
+            return
+
+        ref_data = proxy[self.ref]["data"]
+        points = []
+        for test, r in proxy.items():
             try:
-                ref_rate_clean, ref_vmaf_clean = prepare_data(ref_rate, ref_vmaf)
-                test_rate_clean, test_vmaf_clean = prepare_data(test_rate, test_vmaf)
-                
-                if len(ref_rate_clean) < 4 or len(test_rate_clean) < 4:
-                    r["bdrate-vmaf"] = "insufficient data"
-                    continue
-                    
-                r["bdrate-vmaf"] = bd.bd_rate(
-                    ref_rate_clean, ref_vmaf_clean,
-                    test_rate_clean, test_vmaf_clean,
-                    method="akima"
+                r["bdrate-proxy-psnr-y"] = utils.bd_rate(
+                    [i["bitrate"] for i in ref_data],
+                    [i["proxy-psnr-y"] for i in ref_data],
+                    [i["bitrate"] for i in r["data"]],
+                    [i["proxy-psnr-y"] for i in r["data"]],
                 )
-                
-                for i in self.extra_metrics:
-                    ref_exscore = self.refdata[i]
-                    test_exscore = [j[i] for j in r["data"]]
-                    
-                    ref_rate_clean, ref_score_clean = prepare_data(ref_rate, ref_exscore)
-                    test_rate_clean, test_score_clean = prepare_data(test_rate, test_exscore)
-                    
-                    if len(ref_rate_clean) < 4 or len(test_rate_clean) < 4:
-                        r[f"bdrate-{i}"] = "insufficient data"
-                        continue
-                        
-                    r[f"bdrate-{i}"] = bd.bd_rate(
-                        ref_rate_clean, ref_score_clean,
-                        test_rate_clean, test_score_clean,
-                        method="akima"
-                    )
             except Exception as e:
-                print(f"BD-rate calculation failed for {r['test']}: {str(e)}")
+                r["bdrate-proxy-psnr-y"] = "calculation failed"
+                print(f"BD-rate calculation failed for {test}: {str(e)}")
+            if isinstance(r["bdrate-proxy-psnr-y"], (float, int)):
+                speed = [i["speed"] for i in r["data"] if i["speed"]]
+                points.append(
+                    (statistics.harmonic_mean(speed), r["bdrate-proxy-psnr-y"], test)
+                )
+
+        if self.screen == "pareto":
+            finalists = set(utils.pareto(points))
+        else:
+            finalists = {
+                i[2] for i in sorted(points, key=lambda x: x[1])[: self.screen_top]
+            }
+        finalists.add(self.ref)
+
+        for test in self.testlist:
+            if test not in proxy:
+                continue
+            if test not in finalists:
+                self.result.append(proxy[test])
+                continue
+            st = self.single_tester(test)
+            if not st.run():
+                self.fail.append(test)
+                self.skipbdrate = True
+                self.result.append(proxy[test])
+                continue
+            self.collect(test, st.getdata())
+            self.result[-1]["tier"] = "full"
+            self.result[-1]["bdrate-proxy-psnr-y"] = proxy[test]["bdrate-proxy-psnr-y"]
+        utils.cls()
+        if not self.skipbdrate:
+            self.bdrate()
+
+    def bdrate(self):
+        ref_rate = self.refdata["rate"]
+        vmaf_tab = utils.vmaf_model_list[self.vmaf_model]
+
+        for r in self.result:
+            if r.get("tier") == "proxy":
+                continue
+            test_rate = [i["bitrate"] for i in r["data"]]
+            for metric, tab in [("vmaf", vmaf_tab)] + [
+                (i, i) for i in self.extra_metrics
+            ]:
+                try:
+                    r[f"bdrate-{metric}"] = utils.bd_rate(
+                        ref_rate,
+                        self.refdata[metric],
+                        test_rate,
+                        [i[tab] for i in r["data"]],
+                    )
+                except Exception as e:
+                    r[f"bdrate-{metric}"] = "calculation failed"
+                    print(f"BD-rate calculation failed for {r['test']}: {str(e)}")
 
     def report(self):
         for r in self.result:
-            self.chart.add(r["data"], r["test"])
+            if r.get("tier") != "proxy":
+                self.chart.add(r["data"], r["test"])
         self.chart.render()
         with open("report.html", "r") as file:
             html = file.read()
 
+        def bdrate_line(name, val):
+            if isinstance(val, (float, int)):
+                return f"{name}: {val:.02f}%"
+            return f"{name}: {val}"
+
         report = htmlreport(html)
         for r in self.result:
             vmaf_tab = utils.vmaf_model_list[self.vmaf_model]
-            
-            bdrate_vmaf = r["bdrate-vmaf"]
-            bdrates = f'vmaf: {bdrate_vmaf:.02f}%' if isinstance(bdrate_vmaf, (float, int)) else f'vmaf: {bdrate_vmaf}'
-            
-            for i in self.extra_metrics:
-                bdrate_val = r[f"bdrate-{i}"]
-                if isinstance(bdrate_val, (float, int)):
-                    bdrates += f'<br />{i}: {bdrate_val:.02f}%'
-                else:
-                    bdrates += f'<br />{i}: {bdrate_val}'
 
+            if r.get("tier") == "proxy":
+                columns = ["q", "bitrate", "proxy-psnr-y", "speed"]
+                bdrates = "tier: proxy"
+            else:
+                columns = ["q", "bitrate"] + self.extra_metrics + [vmaf_tab, "speed"]
+                bdrates = bdrate_line("vmaf", r.get("bdrate-vmaf", "skipped"))
+                for i in self.extra_metrics:
+                    bdrates += "<br />" + bdrate_line(i, r.get(f"bdrate-{i}", "skipped"))
+                if "tier" in r:
+                    bdrates = "tier: full<br />" + bdrates
+            if "bdrate-proxy-psnr-y" in r:
+                bdrates += "<br />" + bdrate_line(
+                    "proxy-psnr-y", r["bdrate-proxy-psnr-y"]
+                )
+
+            args = (
+                (f'"{r["test"]}"' if self.builds else self.encoder)
+                + " "
+                + self.threadopt
+                + self.base_args.format(
+                    test=self.build_arg if self.builds else r["test"],
+                    q="{q}",
+                    o="{o}",
+                    passopt="<2-PASS_OPTS>" if self.twopass else "",
+                )
+            )
+            if self.slot:
+                args += f"<br />placement: {placement.label(self.slot)}"
             report.addtable(
                 r["test"],
                 r["data"],
-                ["q", "bitrate"] + self.extra_metrics + [vmaf_tab, "speed"],
+                columns,
                 process=lambda x, y: str(x[y]) + "&ensp;fps"
                 if y == "speed"
                 else str(x[y]) + "&ensp;kbps"
                 if y == "bitrate"
                 else str(x[y]),
-                extra=[
-                    bdrates,
-                    self.encoder
-                    + " "
-                    + self.base_args.format(
-                        test=r["test"],
-                        q="{q}",
-                        o="{o}",
-                        passopt="<2-PASS_OPTS>" if self.twopass else "",
-                    ),
-                ],
+                extra=[args] if self.skipbdrate else [bdrates, args],
                 extratitle=["args"] if self.skipbdrate else ["bd-rate", "args"],
                 exclass=["extra2"] if self.skipbdrate else ["extra", "extra2"],
             )
 
-            report.save("report.html")
+        if not self.skipbdrate:
+            metrics = ["vmaf"] + self.extra_metrics
+            if any("bdrate-proxy-psnr-y" in r for r in self.result):
+                metrics.append("proxy-psnr-y")
+            analysis = pareto_analysis(self.result, metrics)
+            analysis.run()
+            for metric in analysis.frontier:
+                title, data, head, process = analysis.table(metric)
+                report.addtable(title, data, head, process=process)
+            if analysis.points:
+                analysis.render()
+                with open(analysis.output, "r") as file:
+                    report.addchart(file.read())
+
+        if self.regression:
+            report.addtable(f"build regression vs {self.ref}", self.regression)
+
+        if self.skipped:
+            report.addtable("skipped (time budget)", self.skipped)
+
+        report.save("report.html")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Video encoder testing tool')
     
     # Required arguments
-    parser.add_argument('--src', required=True, help='Input video file (VapourSynth script)')
+    parser.add_argument('--src', required=True, nargs='+',
+                        help='Input video file (VapourSynth script). Several scripts or directories of .vpy run as a corpus')
     parser.add_argument('--encoder', required=True, choices=['x264', 'x265', 'svtav1', 'vpxenc'], 
                         help='Encoder to test')
     
@@ -778,8 +1932,52 @@ if __name__ == "__main__":
                         help='Additional metrics to measure (default: %(default)s)')
     parser.add_argument('--ref', type=int, default=0,
                         help='Index of reference encoding for BD-rate calculation (default: %(default)s)')
+    parser.add_argument('--jobs', type=int, default=0,
+                        help='Sources run in parallel in corpus mode, each pinned to its own cores with encoder threads sized to them (default: one per 4 physical cores, at most the number of sources)')
+    parser.add_argument('--corpus-weight', choices=['duration', 'even'], default='duration',
+                        help='Weighting of per-source BD-rates in corpus mode (default: %(default)s)')
+    parser.add_argument('--numa', action='store_true',
+                        help='Pin the run to its own cores and memory node and size encoder threads to them, parallel corpus sources are always pinned')
+    parser.add_argument('--builds', nargs='+',
+                        help='Encoder binaries (paths or names on PATH) to compare with the same arguments (A/B regression mode), needs exactly one --values entry. --encoder still selects log parsing and suffix, --ref picks the baseline build')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Encodes per quality point for speed measurement in regression mode (default: %(default)s)')
+    parser.add_argument('--max-slowdown', type=float, default=2.0,
+                        help='Fail if a build is significantly slower than the baseline by more than this many percent (default: %(default)s)')
+    parser.add_argument('--max-bdrate', type=float, default=0.5,
+                        help='Fail if a build loses more than this many percent VMAF BD-rate against the baseline (default: %(default)s)')
+    parser.add_argument('--alpha', type=float, default=0.05,
+                        help='Significance level for the speed test (default: %(default)s)')
+    parser.add_argument('--screen', choices=['top', 'pareto'],
+                        help='Screen all values with a cheap proxy metric (PSNR-Y of subsampled, downscaled frames) first, and run full VMAF only on the best --screen-top values or on the speed/proxy BD-rate Pareto frontier')
+    parser.add_argument('--screen-top', type=int, default=3,
+                        help='Number of values promoted to full VMAF with --screen top (default: %(default)s)')
+    parser.add_argument('--proxy-step', type=int, default=10,
+                        help='Use every Nth frame for the proxy metric (default: %(default)s)')
+    parser.add_argument('--proxy-scale', type=int, default=2,
+                        help='Downscale factor for the proxy metric (default: %(default)s)')
+    parser.add_argument('--time-budget', type=float,
+                        help='Time budget in hours. Jobs are ordered by estimated cost so every value gets 4 quality points first, jobs that do not fit are skipped')
+    parser.add_argument('--probe-frames', type=int, default=60,
+                        help='Frames to encode for cost estimation in time budget mode, plus a quarter as long probe to separate out startup cost (default: %(default)s)')
 
     args = parser.parse_args()
+
+    if sum(map(bool, (args.time_budget, args.screen, args.builds))) > 1:
+        parser.error('--time-budget, --screen and --builds cannot be combined')
+
+    if args.builds and (args.values is None or len(args.values) != 1):
+        parser.error('--builds takes exactly one --values entry')
+
+    if args.builds:
+        # the tester chdirs into its workspace, so pin every build down now
+        builds = []
+        for build in args.builds:
+            path = os.path.abspath(build) if os.sep in build or (os.altsep and os.altsep in build) else shutil.which(build)
+            if not path or not os.path.isfile(path) or not os.access(path, os.X_OK):
+                parser.error(f'--builds: {build} is not an executable file or on PATH')
+            builds.append(path)
+        args.builds = builds
     
     if args.values is not None:
         processed_values = []
@@ -807,22 +2005,52 @@ if __name__ == "__main__":
         }
         args.suffix = suffix_map.get(args.encoder, '')
 
-    test = tester(
-        src=args.src,
+    sources = corpus.expand(args.src)
+    kwargs = dict(
         encoder=args.encoder,
         base_args=args.base_args,
         test_arg=args.test_arg,
         value=args.values,
         quality=args.quality,
-        workspace=args.workspace,
         suffix=args.suffix,
         link=args.link,
         twopass=args.twopass,
         vmaf_model=args.vmaf_model,
         ref=args.ref,
-        extra_metrics=args.metrics
+        extra_metrics=args.metrics,
+        time_budget=args.time_budget,
+        probe_frames=args.probe_frames,
+        screen=args.screen,
+        screen_top=args.screen_top,
+        proxy_step=args.proxy_step,
+        proxy_scale=args.proxy_scale,
+        builds=args.builds,
+        repeats=args.repeats,
+        max_slowdown=args.max_slowdown,
+        max_bdrate=args.max_bdrate,
+        alpha=args.alpha,
     )
+
+    if not sources:
+        parser.error('no .vpy source found')
+    if len(sources) > 1:
+        test = corpus(
+            sources=sources,
+            workspace=args.workspace or args.test_arg,
+            jobs=args.jobs,
+            weight=args.corpus_weight,
+            numa=args.numa,
+            **kwargs,
+        )
+    else:
+        slot = None
+        if args.numa:
+            slot = placement(1).slots[0]
+            placement.apply(slot)
+        test = tester(src=sources[0], workspace=args.workspace, slot=slot, **kwargs)
     
     test.run()
     test.report()
-    input("\nPress Enter to exit")
\ No newline at end of file
+    if args.builds:
+        sys.exit(test.verdict())
+    input("\nPress Enter to exit")